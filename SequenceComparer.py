@@ -1,11 +1,18 @@
-from burp import IBurpExtender, ITab, IContextMenuFactory
-from javax.swing import JPanel, JLabel, JTable, JScrollPane, JSplitPane, JTabbedPane, JMenuItem, JButton, JCheckBox, ListSelectionModel, JTextArea, Timer, BoxLayout
+from burp import IBurpExtender, ITab, IContextMenuFactory, IHttpListener, IExtensionStateListener
+from javax.swing import JPanel, JLabel, JTable, JScrollPane, JSplitPane, JTabbedPane, JMenuItem, JButton, JCheckBox, ListSelectionModel, JTextArea, Timer, BoxLayout, JFileChooser
+from javax.swing.filechooser import FileNameExtensionFilter
 from javax.swing.border import MatteBorder
 from javax.swing.table import DefaultTableModel, DefaultTableCellRenderer
 from javax.swing.text import DefaultHighlighter
-from java.awt import BorderLayout, Color, Component
-from java.awt.event import ActionListener
+from java.awt import BorderLayout, Color, Component, Point
+from java.awt.event import ActionListener, AdjustmentListener
+from java.util.concurrent import ConcurrentLinkedQueue
 from difflib import Differ
+from bisect import bisect_right
+from threading import Thread
+import codecs
+import json
+import cgi
 import re
 
 
@@ -56,7 +63,101 @@ class ReqTableCellRenderer(DefaultTableCellRenderer):
         return component
 
 
-class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
+class JsonReportWriter(object):
+    # Streams a comparison report as JSON, one diff line at a time
+    def __init__(self, output):
+        self.output = output
+        self.first_row = True
+
+    def begin(self, first_name, second_name):
+        self.output.write('{"first_sequence": %s, "second_sequence": %s, "rows": [' % (
+            json.dumps(first_name), json.dumps(second_name)
+        ))
+
+    def beginRow(self, first, second, status):
+        # first/second are (index, method, url) tuples or None for unmatched rows
+        if not self.first_row:
+            self.output.write(",")
+        self.first_row = False
+
+        def side(info):
+            if info is None:
+                return "null"
+            return json.dumps({"id": info[0] + 1, "method": info[1], "url": info[2]})
+
+        self.output.write('\n{"first": %s, "second": %s, "status": %s' % (side(first), side(second), json.dumps(status)))
+
+    def writeDiff(self, name, lines):
+        self.output.write(', %s: [' % json.dumps(name))
+        for index, line in enumerate(lines):
+            if index:
+                self.output.write(", ")
+            self.output.write(json.dumps(line))
+        self.output.write("]")
+
+    def endRow(self):
+        self.output.write("}")
+
+    def end(self):
+        self.output.write("\n]}\n")
+
+
+class HtmlReportWriter(object):
+    # Streams a comparison report as a self-contained HTML page
+    STYLE = (
+        "body{font-family:sans-serif}table{border-collapse:collapse;margin-bottom:1em}"
+        "td,th{border:1px solid #ccc;padding:2px 6px;text-align:left}"
+        ".identical{background:#b5ffa1}.different{background:#ffd786}"
+        "pre{margin:0 0 1em 0;font-size:12px}"
+        ".del{background:#97c8f6}.add{background:#f1f499}.hint{color:#999}"
+    )
+    DIFF_CLASSES = {"-": "del", "+": "add", "?": "hint"}
+
+    def __init__(self, output):
+        self.output = output
+        self.diff_cell_open = False
+
+    def begin(self, first_name, second_name):
+        # A single table for the whole report, each aligned row is followed by its diffs
+        title = cgi.escape("%s / %s" % (first_name, second_name))
+        self.output.write(
+            '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>SequenceComparer - %s</title>'
+            '<style>%s</style></head><body>\n<h1>%s</h1>\n<table>\n'
+            '<tr><th>ID</th><th>Method</th><th>URL</th><th>ID</th><th>Method</th><th>URL</th><th>Status</th></tr>\n'
+            % (title, self.STYLE, title)
+        )
+
+    def beginRow(self, first, second, status):
+        def side(info):
+            if info is None:
+                return "<td>-</td><td></td><td></td>"
+            return "<td>%d</td><td>%s</td><td>%s</td>" % (info[0] + 1, cgi.escape(info[1]), cgi.escape(info[2]))
+
+        self.output.write('<tr class="%s">%s%s<td>%s</td></tr>\n' % (status, side(first), side(second), status))
+
+    def writeDiff(self, name, lines):
+        if not self.diff_cell_open:
+            self.output.write('<tr><td colspan="7">')
+            self.diff_cell_open = True
+        self.output.write("<h3>%s</h3><pre>" % cgi.escape(name.capitalize()))
+        for line in lines:
+            css_class = self.DIFF_CLASSES.get(line[:1])
+            if css_class:
+                self.output.write('<span class="%s">%s</span>\n' % (css_class, cgi.escape(line)))
+            else:
+                self.output.write("%s\n" % cgi.escape(line))
+        self.output.write("</pre>\n")
+
+    def endRow(self):
+        if self.diff_cell_open:
+            self.output.write("</td></tr>\n")
+            self.diff_cell_open = False
+
+    def end(self):
+        self.output.write("</table>\n</body></html>\n")
+
+
+class BurpExtender(IBurpExtender, ITab, IContextMenuFactory, IHttpListener, IExtensionStateListener):
 
     ############
     ## Layout ##
@@ -121,6 +222,7 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
 
         # Register context menu and add suite tab
         callbacks.registerContextMenuFactory(self)
+        callbacks.registerExtensionStateListener(self)
         callbacks.addSuiteTab(self)
 
 
@@ -146,7 +248,8 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
             ("Reverse selected Sequence order", self.reverseSequenceOrder),
             ("Delete Sequence", self.deleteSequence),
             ("Clear Req panels", self.clearPanels),
-            ("Switch between Request/Response Mode", self.toggleRequestResponse)
+            ("Switch between Request/Response Mode", self.toggleRequestResponse),
+            ("Export Comparison", self.exportComparison)
         ]
         for text, action in buttons:
             self.action_buttons_panel.add(JButton(text, actionPerformed=action))
@@ -154,8 +257,12 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         # Toggles
         self.sync_toggle = JCheckBox("Sync Left/Right selection", actionPerformed=self.toggleSyncMode)
         self.sync_scroll_toggle = JCheckBox("Sync Left/Right scroll", actionPerformed=self.toggleSyncScrollMode)
+        self.line_scroll_toggle = JCheckBox("Line-aligned scroll", actionPerformed=self.toggleLineScrollMode)
+        self.record_toggle = JCheckBox("Record live Sequence against First", actionPerformed=self.toggleRecordMode)
         self.action_buttons_panel.add(self.sync_toggle)
         self.action_buttons_panel.add(self.sync_scroll_toggle)
+        self.action_buttons_panel.add(self.line_scroll_toggle)
+        self.action_buttons_panel.add(self.record_toggle)
 
 
     def setupRequestPanels(self):
@@ -228,6 +335,20 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         self.second_request_response_panel.add(self.second_request_response_editor_scroll, BorderLayout.CENTER)
 
         self.request_response_split_pane = JSplitPane(JSplitPane.HORIZONTAL_SPLIT, self.first_request_response_panel, self.second_request_response_panel)
+
+        # Line-aligned scroll, each side follows the other through the diff's line mapping
+        extender = self
+
+        class firstScrollListener(AdjustmentListener):
+            def adjustmentValueChanged(self, e):
+                extender.syncLineScroll(True)
+
+        class secondScrollListener(AdjustmentListener):
+            def adjustmentValueChanged(self, e):
+                extender.syncLineScroll(False)
+
+        self.first_request_response_editor_scroll.getVerticalScrollBar().addAdjustmentListener(firstScrollListener())
+        self.second_request_response_editor_scroll.getVerticalScrollBar().addAdjustmentListener(secondScrollListener())
         
 
     def mergePanels(self):
@@ -284,10 +405,34 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         self.first_scroll_save = self.first_request_response_editor_scroll.getVerticalScrollBar().getModel()
         self.second_scroll_save = self.second_request_response_editor_scroll.getVerticalScrollBar().getModel()
         self.sync_scroll_unselected = False
+        self.line_scroll_mode = False
+        self.line_scroll_adjusting = False
+        # Sorted line numbers of matching left/right lines, filled by compareMessages
+        self.line_map_first = []
+        self.line_map_second = []
         self.sync_biggest_common_sequence = []
         self.first_request_response_sequence_id = -1
         self.second_request_response_sequence_id = -1
 
+        # Live recording state
+        self.record_mode = False
+        self.record_queue = ConcurrentLinkedQueue()
+        self.record_sequence_id = -1
+        self.record_baseline_id = -1
+        self.record_baseline_urls = []
+        self.record_lcs_column = []
+        self.record_best_node = None
+        self.record_biggest_common_sequence = []
+
+        extender = self
+
+        class flushRecordedMessages(ActionListener):
+            def actionPerformed(self, e):
+                extender.flushRecordedMessages()
+
+        # Recorded messages are applied in batches on the Swing thread
+        self.record_timer = Timer(500, flushRecordedMessages())
+
 
 
     ###################################
@@ -338,6 +483,23 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
             self.highlightTab()
 
 
+    def processHttpMessage(self, toolFlag, messageIsRequest, messageInfo):
+        # Only complete in-scope Proxy messages are recorded, the UI is updated by the record timer
+        if not self.record_mode or messageIsRequest or toolFlag != self.callbacks.TOOL_PROXY:
+            return
+        if not self.callbacks.isInScope(self.helpers.analyzeRequest(messageInfo).getUrl()):
+            return
+        self.record_queue.add(self.callbacks.saveBuffersToTempFiles(messageInfo))
+
+
+    def extensionUnloaded(self):
+        # Not called on the Swing thread : only stop the timer and drop what was not applied yet,
+        # Burp removes the HTTP listener itself
+        self.record_mode = False
+        self.record_timer.stop()
+        self.record_queue.clear()
+
+
 
     ###############
     ## The Stuff ##
@@ -368,6 +530,9 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
     def reverseSequenceOrder(self, event):
         selected_row = self.sequence_table.getSelectedRow()
         if selected_row != -1:
+            # The online alignment assumes messages are only appended
+            if self.record_mode and selected_row in (self.record_sequence_id, self.record_baseline_id):
+                self.stopRecording()
             self.sequence_data[selected_row] = self.sequence_data[selected_row][::-1]
             
             # inverse first/last url and first/last status code from the sequences table
@@ -390,6 +555,9 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
     def deleteSequence(self, event):
         selected_row = self.sequence_table.getSelectedRow()
         if selected_row != -1:
+            # Sequence IDs shift on deletion, the live sequence would lose track of its row
+            if self.record_mode:
+                self.stopRecording()
             self.clearPanels(0)
             self.sequence_data.pop(selected_row)
             self.sequence_table_model.removeRow(selected_row)
@@ -420,9 +588,29 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         self.sync_scroll_mode = self.sync_scroll_toggle.isSelected()
         if not self.sync_scroll_mode:
             self.sync_scroll_unselected = True
+        elif self.line_scroll_mode:
+            self.line_scroll_toggle.setSelected(False)
+            self.line_scroll_mode = False
         self.SyncScrolls()
 
 
+    def toggleLineScrollMode(self, event):
+        self.line_scroll_mode = self.line_scroll_toggle.isSelected()
+        if self.line_scroll_mode:
+            # Both modes drive the same scrollbars, only one can be active
+            if self.sync_scroll_mode:
+                self.sync_scroll_toggle.setSelected(False)
+                self.toggleSyncScrollMode(None)
+            self.syncLineScroll(True)
+
+
+    def toggleRecordMode(self, event):
+        if self.record_toggle.isSelected():
+            self.startRecording()
+        else:
+            self.stopRecording()
+
+
     # Sequence
 
     def addSequence(self, messages):
@@ -471,9 +659,6 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         # Longest Common Subsequence (LCS) problem.
         # It returns the IDs of the elements from both Sequences that forms the longest common Sequence
 
-        def sum_of_differences(indices):
-            return sum(indices[i + 1][1] - indices[i][1] for i in range(len(indices) - 1))
-
         # Dynamic Programming Table
         n1, n2 = len(seq1), len(seq2)
         dp = [[[] for _ in range(n2 + 1)] for _ in range(n1 + 1)]
@@ -488,10 +673,15 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
                     dp[i][j] = max(dp[i - 1][j], dp[i][j - 1], key=len)
 
         # Find the best sequence
-        best_mapping = max(dp[-1], key=lambda x: (len(x), sum_of_differences(x)))
+        best_mapping = max(dp[-1], key=self.commonSequenceScore)
         return best_mapping
 
 
+    def commonSequenceScore(self, indices):
+        # Longest first, then the most spread out on the second Sequence
+        return (len(indices), sum(indices[i + 1][1] - indices[i][1] for i in range(len(indices) - 1)))
+
+
     def refreshBiggestCommonSequence(self):
         # getting the biggest sub sequence
         seq1 = [self.first_sequence_table_model.getValueAt(obj, 3) for obj in range(self.first_sequence_table_model.getRowCount())]
@@ -502,31 +692,196 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         self.second_sequence_table_model.clearRowColors()
 
         for first, second in self.sync_biggest_common_sequence:
-            left_response = self.sequence_data[self.first_request_response_sequence_id][first].getResponse()
-            right_response = self.sequence_data[self.second_request_response_sequence_id][second].getResponse()
-
-            left_body_offset, right_body_offset = 0, 0
-            left_body, right_body = "", ""
-            if left_response != None:
-                left_body_offset = self.helpers.analyzeResponse(left_response).getBodyOffset()
-                left_body = self.helpers.bytesToString(left_response)[left_body_offset:]
-            if right_response != None:
-                right_body_offset = self.helpers.analyzeResponse(right_response).getBodyOffset()
-                right_body = self.helpers.bytesToString(right_response)[right_body_offset:]
-
-            if left_body == right_body:
-                self.first_sequence_table_model.setRowColor(first, Color(0xb5ffa1))
-                self.second_sequence_table_model.setRowColor(second, Color(0xb5ffa1))
+            self.colorCommonPair(first, second)
+
+
+    def colorCommonPair(self, first, second):
+        # Green if both responses have the same body, orange otherwise
+        left_body = self.getResponseBody(self.sequence_data[self.first_request_response_sequence_id][first])
+        right_body = self.getResponseBody(self.sequence_data[self.second_request_response_sequence_id][second])
+
+        if left_body == right_body:
+            self.first_sequence_table_model.setRowColor(first, Color(0xb5ffa1))
+            self.second_sequence_table_model.setRowColor(second, Color(0xb5ffa1))
+        else:
+            self.first_sequence_table_model.setRowColor(first, Color(0xffd786))
+            self.second_sequence_table_model.setRowColor(second, Color(0xffd786))
+
+
+    def getResponseBody(self, message):
+        # Response body without headers, empty if there is no response
+        response = message.getResponse()
+        if response == None:
+            return ""
+        body_offset = self.helpers.analyzeResponse(response).getBodyOffset()
+        return self.helpers.bytesToString(response)[body_offset:]
+
+
+    # Live recording
+
+    def startRecording(self):
+        # The First Sequence is the baseline, the live Sequence is displayed as the Second one
+        baseline_id = self.first_request_response_sequence_id
+        if baseline_id == -1:
+            self.record_toggle.setSelected(False)
+            return
+
+        self.record_sequence_id = len(self.sequence_data)
+        self.sequence_data.append([])
+        self.sequence_table_model.addRow([
+            self.record_sequence_id + 1, "Live Sequence", 0, "N/A", "N/A", "N/A", "N/A", 0
+        ])
+
+        self.second_request_response_sequence_id = self.record_sequence_id
+        self.second_sequence_table_model.setRowCount(0)
+        self.first_request_response_editor.setText("")
+        self.second_request_response_editor.setText("")
+        self.second_sequence_table_model.clearRowColors()
+        self.first_sequence_table_model.clearRowColors()
+        self.first_sequence_table_model.fireTableDataChanged()
+        self.sync_biggest_common_sequence = []
+
+        # One column of findBiggestCommonSequence's DP table, extended as messages arrive
+        self.record_baseline_id = baseline_id
+        self.record_baseline_urls = [self.first_sequence_table_model.getValueAt(obj, 3) for obj in range(self.first_sequence_table_model.getRowCount())]
+        self.record_lcs_column = [None] * (len(self.record_baseline_urls) + 1)
+        self.record_best_node = None
+        self.record_biggest_common_sequence = []
+
+        self.record_queue.clear()
+        self.record_mode = True
+        self.callbacks.registerHttpListener(self)
+        self.record_timer.start()
+
+
+    def stopRecording(self):
+        if self.record_mode:
+            self.record_mode = False
+            self.callbacks.removeHttpListener(self)
+            self.record_timer.stop()
+            # Apply what was captured before the listener was removed
+            self.flushRecordedMessages()
+        self.record_sequence_id = -1
+        self.record_toggle.setSelected(False)
+
+
+    def flushRecordedMessages(self):
+        if self.record_sequence_id == -1:
+            return
+
+        messages = []
+        message = self.record_queue.poll()
+        while message is not None:
+            messages.append(message)
+            message = self.record_queue.poll()
+        if not messages:
+            return
+
+        live_sequence = self.sequence_data[self.record_sequence_id]
+        start = len(live_sequence)
+        live_sequence.extend(messages)
+        self.updateLiveSequenceRow(messages, start == 0)
+
+        analyze = self.helpers.analyzeRequest
+        best_node = self.record_best_node
+        for idx, message in enumerate(messages, start):
+            self.extendBiggestCommonSequence(analyze(message).getUrl().toString(), idx)
+        if self.record_best_node is not best_node:
+            self.record_biggest_common_sequence = self.buildCommonSequence(self.record_best_node)
+
+        if self.second_request_response_sequence_id != self.record_sequence_id:
+            return
+
+        # The second table must always match the live Sequence data row for row
+        if self.second_sequence_table_model.getRowCount() == start:
+            self.appendTableRows(self.second_sequence_table_model, messages, start)
+        else:
+            self.populateTable(self.second_sequence_table_model, live_sequence)
+
+        # Colors are only updated while the live Sequence is compared against its baseline
+        if self.first_request_response_sequence_id != self.record_baseline_id:
+            return
+
+        old_pairs = set(self.sync_biggest_common_sequence)
+        new_pairs = set(self.record_biggest_common_sequence)
+        for first, second in old_pairs - new_pairs:
+            self.first_sequence_table_model.setRowColor(first, None)
+            self.second_sequence_table_model.setRowColor(second, None)
+        for first, second in new_pairs - old_pairs:
+            self.colorCommonPair(first, second)
+        self.sync_biggest_common_sequence = self.record_biggest_common_sequence
+
+
+    def extendBiggestCommonSequence(self, url, second):
+        # Online version of findBiggestCommonSequence : computes the DP column of the newly
+        # appended message from the previous one.
+        # Cells are back-pointer nodes (length, first second ID, pair, previous node) shared between
+        # cells instead of pair lists, so each message costs O(len(baseline))
+        def length(node):
+            return node[0] if node else 0
+
+        def score(node):
+            # Same as commonSequenceScore, the sum of differences is last - first
+            return (node[0], node[2][1] - node[1]) if node else (0, 0)
+
+        seq1 = self.record_baseline_urls
+        previous_column = self.record_lcs_column
+        column = [None]
+
+        for i in range(1, len(seq1) + 1):
+            if seq1[i - 1] == url:
+                previous = previous_column[i - 1]
+                first_second = previous[1] if previous else second
+                column.append((length(previous) + 1, first_second, (i - 1, second), previous))
             else:
-                self.first_sequence_table_model.setRowColor(first, Color(0xffd786))
-                self.second_sequence_table_model.setRowColor(second, Color(0xffd786))               
+                column.append(max(column[i - 1], previous_column[i], key=length))
+
+        self.record_lcs_column = column
+        if score(column[-1]) > score(self.record_best_node):
+            self.record_best_node = column[-1]
+
+
+    def buildCommonSequence(self, node):
+        # Walk the back-pointers of an online alignment node to get its pairs in order
+        pairs = []
+        while node:
+            pairs.append(node[2])
+            node = node[3]
+        pairs.reverse()
+        return pairs
+
+
+    def updateLiveSequenceRow(self, messages, is_first_batch):
+        # Incrementally refresh the live Sequence summary in the sequences table
+        row = self.record_sequence_id
+        model = self.sequence_table_model
+
+        def status_code(message):
+            return self.helpers.analyzeResponse(message.getResponse()).getStatusCode() if message.getResponse() else "N/A"
+
+        added_length = sum(
+            len(msg.getRequest()) + (len(msg.getResponse()) if msg.getResponse() else 0)
+            for msg in messages
+        )
+
+        model.setValueAt(len(self.sequence_data[row]), row, 2)
+        if is_first_batch:
+            model.setValueAt(self.helpers.analyzeRequest(messages[0]).getUrl().toString(), row, 3)
+            model.setValueAt(status_code(messages[0]), row, 4)
+        model.setValueAt(self.helpers.analyzeRequest(messages[-1]).getUrl().toString(), row, 5)
+        model.setValueAt(status_code(messages[-1]), row, 6)
+        model.setValueAt(model.getValueAt(row, 7) + added_length, row, 7)
 
 
     # Requests/Responses
 
     def populateTable(self, model, messages):
         model.setRowCount(0)  # Clear existing rows
-        for idx, message in enumerate(messages):
+        self.appendTableRows(model, messages, 0)
+
+
+    def appendTableRows(self, model, messages, start):
+        for idx, message in enumerate(messages, start):
             request_info = self.helpers.analyzeRequest(message)
             host = message.getHttpService().getHost()
             method = request_info.getMethod()
@@ -584,8 +939,23 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
         left_line_index, right_line_index = 0, 0
         Blue, Yellow, Orange = Color(0x97c8f6), Color(0xf1f499), Color(0xffd786)
 
+        # Line mapping for the line-aligned scroll : the first line of every unchanged block on both sides
+        left_line_number, right_line_number = 0, 0
+        line_map_first, line_map_second = [0], [0]
+        in_unchanged_block = True
+
         for index, line in enumerate(diff):
             text = line[2:] + "\n"
+            if not line.startswith("?"):
+                if line.startswith(" ") and not in_unchanged_block:
+                    line_map_first.append(left_line_number)
+                    line_map_second.append(right_line_number)
+                in_unchanged_block = line.startswith(" ")
+                if not line.startswith("+"):
+                    left_line_number += 1
+                if not line.startswith("-"):
+                    right_line_number += 1
+
             if line.startswith(" "):  # Unchanged lines
                 left_text.append(text)
                 left_line_index += len(text)
@@ -628,12 +998,21 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
 
 
 
+        # The (empty) last line of both editors closes a trailing changed block
+        if not in_unchanged_block:
+            line_map_first.append(left_line_number)
+            line_map_second.append(right_line_number)
+        self.line_map_first, self.line_map_second = line_map_first, line_map_second
+
         # Set text and highlight
         self.setTextWithHighlight(self.first_request_response_editor, left_text, left_text_highlights)
         self.setTextWithHighlight(self.second_request_response_editor, right_text, right_text_highlights)
 
 
     def displayFirstRequestResponse(self, event):
+        # Only a comparison has a line mapping, compareMessages sets it back
+        self.line_map_first, self.line_map_second = [], []
+
         selected_row = self.first_sequence_table.getSelectedRow()
         if selected_row != -1:
             sequence_index = self.first_request_response_sequence_id
@@ -669,6 +1048,9 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
 
 
     def displaySecondRequestResponse(self, event):
+        # Only a comparison has a line mapping, compareMessages sets it back
+        self.line_map_first, self.line_map_second = [], []
+
         selected_row = self.second_sequence_table.getSelectedRow()
         if selected_row != -1:
             sequence_index = self.second_request_response_sequence_id
@@ -722,3 +1104,166 @@ class BurpExtender(IBurpExtender, ITab, IContextMenuFactory):
                 self.first_request_response_editor.setCaretPosition(0)
                 self.second_request_response_editor.setCaretPosition(0)  
                 self.sync_scroll_unselected = False
+
+
+    def mapLine(self, line, source_map, target_map):
+        # Translate a line number from one side to the other with a binary search on the line mapping.
+        # Inside an unchanged block lines match one to one, inside a changed block the other side
+        # stays on its own changed lines until both reach the next unchanged block
+        block = bisect_right(source_map, line) - 1
+        mapped = target_map[block] + line - source_map[block]
+        if block + 1 < len(target_map):
+            mapped = min(mapped, max(target_map[block + 1] - 1, target_map[block]))
+        return mapped
+
+
+    def syncLineScroll(self, from_first):
+        # Scroll the other editor so that the line matching the top visible line is side by side
+        if not self.line_scroll_mode or self.line_scroll_adjusting or not self.line_map_first:
+            return
+
+        if from_first:
+            source_editor, source_scroll = self.first_request_response_editor, self.first_request_response_editor_scroll
+            target_editor, target_scroll = self.second_request_response_editor, self.second_request_response_editor_scroll
+            source_map, target_map = self.line_map_first, self.line_map_second
+        else:
+            source_editor, source_scroll = self.second_request_response_editor, self.second_request_response_editor_scroll
+            target_editor, target_scroll = self.first_request_response_editor, self.first_request_response_editor_scroll
+            source_map, target_map = self.line_map_second, self.line_map_first
+
+        top = source_scroll.getViewport().getViewPosition().y
+        line = source_editor.getLineOfOffset(source_editor.viewToModel(Point(0, top)))
+        line_view = source_editor.modelToView(source_editor.getLineStartOffset(line))
+
+        target_line = min(self.mapLine(line, source_map, target_map), target_editor.getLineCount() - 1)
+        target_view = target_editor.modelToView(target_editor.getLineStartOffset(target_line))
+        if line_view is None or target_view is None:
+            return
+
+        # Keep the same offset inside the line so that scrolling stays smooth
+        self.line_scroll_adjusting = True
+        try:
+            target_scroll.getVerticalScrollBar().setValue(target_view.y + top - line_view.y)
+        finally:
+            self.line_scroll_adjusting = False
+
+
+    # Export
+
+    def getMessageText(self, message, request):
+        # Full request or response as a string, empty if missing
+        data = message.getRequest() if request else message.getResponse()
+        if data == None:
+            return ""
+        return self.helpers.bytesToString(data)
+
+
+    def iterAlignment(self, first_count, second_count, mapping):
+        # Walks both sequences in order, yielding (first, second) index pairs.
+        # Rows outside the common sequence are yielded with None on the other side
+        first, second = 0, 0
+        for matched_first, matched_second in mapping:
+            while first < matched_first:
+                yield first, None
+                first += 1
+            while second < matched_second:
+                yield None, second
+                second += 1
+            yield matched_first, matched_second
+            first, second = matched_first + 1, matched_second + 1
+        while first < first_count:
+            yield first, None
+            first += 1
+        while second < second_count:
+            yield None, second
+            second += 1
+
+
+    def exportComparison(self, event):
+        first_sequence_id = self.first_request_response_sequence_id
+        second_sequence_id = self.second_request_response_sequence_id
+        if first_sequence_id == -1 or second_sequence_id == -1:
+            self.callbacks.printError("Comparison export : select a First and a Second Sequence first")
+            return
+
+        chooser = JFileChooser()
+        json_filter = FileNameExtensionFilter("JSON report (*.json)", ["json"])
+        html_filter = FileNameExtensionFilter("HTML report (*.html)", ["html", "htm"])
+        chooser.addChoosableFileFilter(json_filter)
+        chooser.addChoosableFileFilter(html_filter)
+        chooser.setFileFilter(html_filter)
+        if chooser.showSaveDialog(self.main_panel) != JFileChooser.APPROVE_OPTION:
+            return
+
+        path = chooser.getSelectedFile().getAbsolutePath()
+        lower_path = path.lower()
+        if lower_path.endswith(".json"):
+            writer_class = JsonReportWriter
+        elif lower_path.endswith(".html") or lower_path.endswith(".htm"):
+            writer_class = HtmlReportWriter
+        elif chooser.getFileFilter() == json_filter:
+            writer_class, path = JsonReportWriter, path + ".json"
+        else:
+            writer_class, path = HtmlReportWriter, path + ".html"
+
+        # Snapshot the state so the export is not affected by later UI changes
+        first_messages = list(self.sequence_data[first_sequence_id])
+        second_messages = list(self.sequence_data[second_sequence_id])
+        first_name = self.sequence_table_model.getValueAt(first_sequence_id, 1)
+        second_name = self.sequence_table_model.getValueAt(second_sequence_id, 1)
+        # The common sequence holds table row IDs, it only applies to the data if both tables match it
+        if (self.first_sequence_table_model.getRowCount() == len(first_messages)
+                and self.second_sequence_table_model.getRowCount() == len(second_messages)):
+            mapping = list(self.sync_biggest_common_sequence)
+        else:
+            mapping = None
+
+        # Diffs can be slow on big sequences, keep Burp's UI responsive
+        thread = Thread(target=self.writeComparisonReport, args=(
+            path, writer_class, first_name, second_name, first_messages, second_messages, mapping
+        ))
+        thread.setDaemon(True)
+        thread.start()
+
+
+    def writeComparisonReport(self, path, writer_class, first_name, second_name, first_messages, second_messages, mapping):
+        # Each pair's diff is written as it is generated, nothing is accumulated in memory
+        def info(messages, index):
+            if index is None:
+                return None
+            request_info = self.helpers.analyzeRequest(messages[index])
+            return (index, request_info.getMethod(), request_info.getUrl().toString())
+
+        try:
+            if mapping is None:
+                # The tables did not match the data, align the snapshot by URL the way the UI does
+                mapping = self.findBiggestCommonSequence(
+                    [info(first_messages, index)[2] for index in range(len(first_messages))],
+                    [info(second_messages, index)[2] for index in range(len(second_messages))]
+                )
+
+            output = codecs.open(path, "w", "utf-8")
+            try:
+                writer = writer_class(output)
+                writer.begin(first_name, second_name)
+                for first, second in self.iterAlignment(len(first_messages), len(second_messages), mapping):
+                    if first is None or second is None:
+                        writer.beginRow(info(first_messages, first), info(second_messages, second), "unmatched")
+                        writer.endRow()
+                        continue
+
+                    message1, message2 = first_messages[first], second_messages[second]
+                    same = self.getResponseBody(message1) == self.getResponseBody(message2)
+                    writer.beginRow(info(first_messages, first), info(second_messages, second), "identical" if same else "different")
+                    for name, request in (("request", True), ("response", False)):
+                        writer.writeDiff(name, Differ().compare(
+                            self.getMessageText(message1, request).splitlines(),
+                            self.getMessageText(message2, request).splitlines()
+                        ))
+                    writer.endRow()
+                writer.end()
+            finally:
+                output.close()
+            self.callbacks.printOutput("Comparison exported to " + path)
+        except Exception as e:
+            self.callbacks.printError("Comparison export failed: " + str(e))